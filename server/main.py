@@ -1,19 +1,109 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi.datastructures import Headers
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import io
+import asyncio
+import hashlib
+import threading
+import time
 import fitz  # PyMuPDF
 from docx import Document
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import random
 import re
-from typing import List, Dict, Any
+import numpy as np
+try:
+    # google-re2 (optional): linear-time automaton matching for the skill scans,
+    # no backtracking on long resumes. Falls back to the standard re module
+    import re2 as skill_regex
+except ImportError:
+    skill_regex = re
+import ahocorasick
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+from typing import BinaryIO, FrozenSet, Hashable, List, Mapping, Dict, Any, Optional, Tuple, Union
 from dotenv import load_dotenv
+try:
+    # spaCy (optional): local NER model, see LOCAL_NER_MODEL
+    import spacy
+except ImportError:
+    spacy = None
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title="Resume Analysis API")
+# Thread pools for blocking work, so offloaded calls don't compete with an unbounded
+# default executor: one for file hashing and parsing, and a separate one for model
+# inference (Hugging Face API calls and the local NER model). API calls can block
+# for a long time when Hugging Face is slow, and must not starve /upload-resume
+EXECUTOR_MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", "8"))
+INFERENCE_EXECUTOR_MAX_WORKERS = int(os.getenv("INFERENCE_EXECUTOR_MAX_WORKERS", "8"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start-up and shutdown of the app's background resources, in a fixed order: the
+    thread pools first, since the local NER model and the category warm-up run on them
+    """
+    loop = asyncio.get_running_loop()
+    app.state.executor = ThreadPoolExecutor(max_workers=EXECUTOR_MAX_WORKERS, thread_name_prefix="worker")
+    app.state.inference_executor = ThreadPoolExecutor(
+        max_workers=INFERENCE_EXECUTOR_MAX_WORKERS, thread_name_prefix="inference"
+    )
+    
+    app.state.local_ner = await loop.run_in_executor(app.state.executor, load_local_ner_model)
+    if app.state.local_ner is not None:
+        print(f"✅ Local NER model '{LOCAL_NER_MODEL}' loaded")
+    else:
+        print("⚠️  No local NER model installed. Using Hugging Face NER API")
+    
+    app.state.ner_queue = asyncio.Queue()
+    app.state.ner_batch_worker = asyncio.create_task(ner_batch_worker(app.state.ner_queue))
+    
+    # Not awaited: startup should neither wait on nor fail because of the API.
+    # Kept on app.state so early requests can wait for it instead of re-fetching
+    app.state.category_warmup = asyncio.create_task(warm_up_category_embeddings())
+    
+    try:
+        yield
+    finally:
+        app.state.ner_batch_worker.cancel()
+        app.state.category_warmup.cancel()
+        app.state.inference_executor.shutdown(wait=False)
+        app.state.executor.shutdown(wait=False)
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject resume uploads whose declared Content-Length is over the limit before the
+    body is received and spooled to disk (the form is parsed before the handler runs).
+    Plain ASGI, so other requests pass straight through
+    """
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/upload-resume":
+            content_length = Headers(scope=scope).get("content-length", "")
+            if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BODY_SIZE:
+                # Exceptions raised in middleware bypass FastAPI's handlers, so respond directly
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)} MB."}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app = FastAPI(title="Resume Analysis API", lifespan=lifespan)
+
+# Added before CORS so CORS wraps it and the early 413 carries CORS headers
+# (the last middleware added is the outermost)
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # CORS middleware to allow frontend requests
 app.add_middleware(
@@ -35,19 +125,165 @@ HF_API_URL_NER = HF_API_URL_NER_OPTIONS[0]  # Use first working option
 HF_API_URL_EMBEDDING = "https://api-inference.huggingface.co/models/sentence-transformers/all-MiniLM-L6-v2"
 HF_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN", "")
 
+# Optional local NER: when spaCy and this model are installed, entities are extracted
+# in-process (no network round-trip) and the Hugging Face API is only a fallback
+LOCAL_NER_MODEL = os.getenv("LOCAL_NER_MODEL", "en_core_web_sm")
+LOCAL_NER_LOCK = threading.Lock()
+# spaCy labels mapped onto the CoNLL-style groups returned by the Hugging Face models
+SPACY_ENTITY_GROUPS = {"ORG": "ORG", "PERSON": "PER", "GPE": "LOC", "LOC": "LOC"}
+
+# 503 "model is loading" errors are retried in-process with exponential backoff
+HF_LOADING_RETRIES = 4
+HF_LOADING_BACKOFF_BASE = 0.5  # seconds; doubled on every retry, plus up to 0.1s of jitter
+
+# Concurrent /extract-skills requests are coalesced into batched NER API calls
+NER_BATCH_MAX_SIZE = 8
+NER_BATCH_MAX_LATENCY = 0.01  # seconds to wait for more requests before sending a batch
+# Long texts are split into chunks of roughly 128 tokens before NER: attention cost
+# grows quadratically with sequence length, and whole resumes can exceed the
+# model's 512-token limit
+NER_CHUNK_MAX_CHARS = 512
+# Pieces of a line longer than NER_CHUNK_MAX_CHARS overlap by up to this many chars,
+# so a multi-word entity across a cut (e.g. "Google Cloud") is seen whole at least once
+NER_CHUNK_OVERLAP_CHARS = 32
+
 # Log token status (without exposing the actual token)
 if HF_API_TOKEN:
     print("✅ Hugging Face API token loaded successfully")
 else:
     print("⚠️  No Hugging Face API token found. Using public API (may have rate limits)")
 
-def call_hf_api(url: str, inputs: str, task: str = "ner", retry_urls: List[str] = None):
+# Shared HTTP session for the Hugging Face API: keeps connections alive between
+# calls (no new TCP+TLS handshake per request) and retries transient gateway errors
+HF_SESSION = requests.Session()
+HF_SESSION.headers.update({"Content-Type": "application/json"})
+if HF_API_TOKEN:
+    HF_SESSION.headers["Authorization"] = f"Bearer {HF_API_TOKEN}"
+HF_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        # A read timeout means the inference request reached the API, so retrying it would
+        # re-run inference and multiply the 30s timeout; only connection errors are retried
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[502, 504],  # 503 (model loading) is retried by run_inference
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False,  # Return the last response so call_hf_api handles the status
+    ),
+))
+
+# Common skill categories for analysis (module-level and immutable, built once;
+# read-only views so handlers cannot modify the shared tables)
+SKILL_CATEGORIES: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "Programming Languages": ("Python", "Java", "JavaScript", "TypeScript", "C++", "Go", "Rust", "Swift", "Kotlin"),
+    "Frontend": ("React", "Vue", "Angular", "HTML", "CSS", "Tailwind CSS", "Next.js", "Redux"),
+    "Backend": ("Node.js", "Django", "Flask", "FastAPI", "Spring Boot", "Express.js", "REST API", "GraphQL"),
+    "Databases": ("PostgreSQL", "MongoDB", "MySQL", "Redis", "Elasticsearch", "SQL", "NoSQL"),
+    "Cloud & DevOps": ("AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "CI/CD", "Jenkins", "Git"),
+    "Data Science": ("Machine Learning", "Deep Learning", "Data Science", "AI", "NLP", "TensorFlow", "PyTorch", "Pandas"),
+    "Tools & Others": ("Git", "Linux", "Agile", "Scrum", "Microservices", "System Design")
+})
+
+# Lowercased category skills, for set-based keyword matching against user skills
+CATEGORY_SKILLS_LOWER: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    category: frozenset(s.lower() for s in category_skills)
+    for category, category_skills in SKILL_CATEGORIES.items()
+})
+
+# Common skill keywords used to decide whether an NER entity is a skill
+SKILL_KEYWORDS: FrozenSet[str] = frozenset([
+    'python', 'java', 'javascript', 'react', 'node', 'aws', 'docker', 
+    'kubernetes', 'sql', 'mongodb', 'postgresql', 'git', 'linux', 
+    'agile', 'scrum', 'machine learning', 'ai', 'data science',
+    'typescript', 'angular', 'vue', 'django', 'flask', 'fastapi',
+    'html', 'css', 'tailwind', 'bootstrap', 'redux', 'graphql',
+    'rest api', 'microservices', 'ci/cd', 'jenkins', 'terraform',
+    'azure', 'gcp', 'redis', 'elasticsearch', 'kafka', 'spark'
+])
+
+def build_keyword_automaton(keywords: FrozenSet[str]) -> ahocorasick.Automaton:
+    """Build an Aho-Corasick automaton that reports every keyword found in a text"""
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+# Aho-Corasick automaton over the keywords: finds every keyword contained in an
+# entity in a single pass, instead of one substring search per keyword
+SKILL_KEYWORD_AUTOMATON = build_keyword_automaton(SKILL_KEYWORDS)
+
+# Comprehensive skill patterns for the regex fallback, compiled once into a single
+# alternation so the text is scanned in one pass instead of once per pattern
+SKILL_PATTERNS = [
+    # Programming Languages
+    r'Python|Java|JavaScript|TypeScript|C\+\+|C#|Go|Rust|Swift|Kotlin|Scala|Ruby|PHP|Perl|R|MATLAB',
+    # Frontend
+    r'React|Vue|Angular|Next\.js|Nuxt\.js|Svelte|HTML|CSS|SCSS|SASS|Tailwind|Bootstrap|Material-UI|Redux|MobX',
+    # Backend
+    r'Node\.js|Express|Django|Flask|FastAPI|Spring|Spring Boot|Laravel|ASP\.NET|Rails|GraphQL|REST API',
+    # Databases
+    r'PostgreSQL|MySQL|MongoDB|Redis|Elasticsearch|Cassandra|DynamoDB|SQLite|Oracle|SQL Server|NoSQL|SQL|Kafka',
+    # Cloud & DevOps
+    r'AWS|Azure|GCP|Google Cloud|Docker|Kubernetes|Terraform|Ansible|Jenkins|CI/CD|Git|GitHub|GitLab',
+    # Data Science
+    r'Machine Learning|ML|Deep Learning|AI|Data Science|NLP|Computer Vision|TensorFlow|PyTorch|Keras|Pandas|NumPy|Scikit-learn',
+    # Tools
+    r'Linux|Unix|Bash|Shell|Agile|Scrum|JIRA|Confluence|Microservices|System Design|API Design',
+]
+SKILL_RE = skill_regex.compile(r'(?i)\b(?:' + '|'.join(SKILL_PATTERNS) + r')\b')
+
+# Categories where the user already has at least this share of the skills are scored
+# by keyword overlap alone in /analyze-skills, without comparing embeddings
+KEYWORD_COVERAGE_THRESHOLD = 0.7
+
+# PyMuPDF text extraction flags: plain text with ligatures expanded and
+# hyphenated line breaks joined, which is all the NER/regex steps need
+PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_DEHYPHENATE
+# Resumes longer than this are outliers; later pages are not parsed
+MAX_PDF_PAGES = 10
+# Uploads larger than this are rejected with 413
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+# Request bodies are checked against the declared Content-Length before they are read;
+# the multipart body adds a little framing around the file itself
+MAX_UPLOAD_BODY_SIZE = MAX_UPLOAD_SIZE + 64 * 1024
+
+# Category texts never change, so their (L2-normalized) embeddings are fetched
+# once and reused across requests instead of hitting the API for every category.
+# CATEGORY_MATRIX holds the same vectors stacked for a single matmul per request
+CATEGORY_EMBEDDINGS: Dict[str, np.ndarray] = {}
+CATEGORY_MATRIX: Optional[Tuple[List[str], Optional[np.ndarray]]] = None
+
+# In-flight user embedding lookups keyed by normalized skills text, so concurrent
+# requests for the same skills share one API call (only touched on the event loop)
+EMBEDDINGS_IN_FLIGHT: Dict[str, asyncio.Future] = {}
+
+# In-memory TTL caches for re-uploads and re-runs of the same resume: extracted text
+# keyed by the extractor and a BLAKE2b digest of the uploaded file (the same bytes
+# uploaded as .pdf and as .docx must not share an entry), and NER entities keyed by a SHA-256
+# of each text chunk (so unchanged chunks of an edited resume are not re-sent).
+# Both are also LRU-bounded so a burst of distinct uploads cannot grow them unchecked
+CACHE_TTL_SECONDS = 60 * 60
+TEXT_CACHE_SIZE = 128
+NER_CACHE_SIZE = 1024
+TEXT_CACHE: "OrderedDict[Tuple[str, bytes], Tuple[float, str]]" = OrderedDict()
+NER_CACHE: "OrderedDict[bytes, Tuple[float, list]]" = OrderedDict()
+
+# LRU cache of user skill embeddings keyed by a SHA-256 of the normalized skill list,
+# so re-submitting the same skills skips the embedding API call. The cache is per
+# worker process; handlers run the lookups from executor threads, hence the lock
+USER_EMBEDDING_CACHE_SIZE = 1024
+USER_EMBEDDING_CACHE: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+USER_EMBEDDING_CACHE_LOCK = threading.Lock()
+
+def call_hf_api(url: str, inputs: Union[str, List[str]], task: str = "ner", retry_urls: List[str] = None):
     """Call Hugging Face Inference API with fallback options"""
-    headers = {"Content-Type": "application/json"}
-    if HF_API_TOKEN:
-        headers["Authorization"] = f"Bearer {HF_API_TOKEN}"
-    
-    payload = {"inputs": inputs}
+    # wait_for_model makes the API hold the request while a cold model loads
+    # instead of answering 503 right away
+    payload = {"inputs": inputs, "options": {"wait_for_model": True}}
     
     # List of URLs to try (for fallback)
     urls_to_try = [url]
@@ -57,7 +293,7 @@ def call_hf_api(url: str, inputs: str, task: str = "ner", retry_urls: List[str]
     last_error = None
     for attempt_url in urls_to_try:
         try:
-            response = requests.post(attempt_url, headers=headers, json=payload, timeout=30)
+            response = HF_SESSION.post(attempt_url, json=payload, timeout=30)
             
             # Handle 410 Gone - try next URL
             if response.status_code == 410:
@@ -97,54 +333,190 @@ def call_hf_api(url: str, inputs: str, task: str = "ner", retry_urls: List[str]
     if last_error:
         raise HTTPException(status_code=410, detail="All NER models are unavailable. Please try again later or use an alternative approach.")
 
-def extract_skills_with_api(text: str):
-    """Extract skills using Hugging Face NER API with fallback"""
+def extract_skills_with_api(texts: List[str]) -> List[list]:
+    """Extract entities for a batch of texts using Hugging Face NER API with fallback"""
     try:
         # Call Hugging Face NER API with fallback options
+        # A single text is sent as-is; a list of texts returns one entity list per text
         result = call_hf_api(
             HF_API_URL_NER, 
-            text, 
+            texts[0] if len(texts) == 1 else texts, 
             "ner",
             retry_urls=HF_API_URL_NER_OPTIONS[1:]  # Try other models if first fails
         )
         
         # Process results
-        entities = []
-        if isinstance(result, list):
-            entities = result
-        elif isinstance(result, dict) and "error" in result:
+        if isinstance(result, dict) and "error" in result:
             # If model is loading, wait and retry
             if "loading" in result["error"].lower():
                 raise HTTPException(status_code=503, detail="Model is loading, please try again in a few seconds")
             raise HTTPException(status_code=500, detail=f"API error: {result['error']}")
+        if not isinstance(result, list):
+            return [[] for _ in texts]
+        if len(texts) == 1:
+            return [result]
+        if len(result) != len(texts) or not all(isinstance(entities, list) for entities in result):
+            raise HTTPException(status_code=500, detail="Unexpected batched NER API response")
         
-        return entities
+        return result
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling NER API: {str(e)}")
 
-def get_embeddings_with_api(text: str):
-    """Get embeddings using Hugging Face Inference API"""
+def load_local_ner_model():
+    """Load the optional local spaCy NER model (None if spaCy or the model is not installed)"""
+    if spacy is None:
+        return None
     try:
-        result = call_hf_api(HF_API_URL_EMBEDDING, text, "embedding")
+        # Only the NER component is needed
+        return spacy.load(LOCAL_NER_MODEL, disable=["tagger", "parser", "attribute_ruler", "lemmatizer"])
+    except OSError:
+        return None
+
+def extract_skills_locally(texts: List[str]) -> List[list]:
+    """Extract entities for a batch of texts with the local spaCy model"""
+    results = []
+    # spaCy pipelines are not guaranteed to be thread-safe
+    with LOCAL_NER_LOCK:
+        for doc in app.state.local_ner.pipe(texts):
+            results.append([
+                {"entity_group": SPACY_ENTITY_GROUPS.get(ent.label_, "MISC"), "word": ent.text}
+                for ent in doc.ents
+            ])
+    return results
+
+def extract_entities_batch(texts: List[str]) -> List[list]:
+    """Extract entities for a batch of texts: local model first, Hugging Face API as fallback"""
+    if app.state.local_ner is not None:
+        try:
+            return extract_skills_locally(texts)
+        except Exception as e:
+            print(f"⚠️  Local NER failed: {str(e)}, using Hugging Face NER API")
+    return extract_skills_with_api(texts)
+
+async def run_inference(func, *args):
+    """
+    Run a blocking inference call on the inference pool, retrying with exponential
+    backoff and jitter while the model is loading (503). The backoff is awaited on
+    the event loop, so no pool thread is held while waiting
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(HF_LOADING_RETRIES + 1):
+        try:
+            return await loop.run_in_executor(app.state.inference_executor, func, *args)
+        except HTTPException as e:
+            if e.status_code != 503 or attempt == HF_LOADING_RETRIES:
+                raise
+        await asyncio.sleep(HF_LOADING_BACKOFF_BASE * 2 ** attempt + random.random() * 0.1)
+
+async def run_ner_batch(batch: List[Tuple[str, asyncio.Future]]):
+    """Run NER on one batch of queued texts and resolve their futures"""
+    texts = [text for text, _ in batch]
+    try:
+        # Blocking model inference or HTTP call, run it off the event loop
+        results = await run_inference(extract_entities_batch, texts)
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+    else:
+        for (_, future), entities in zip(batch, results):
+            if not future.done():
+                future.set_result(entities)
+
+async def ner_batch_worker(queue: asyncio.Queue):
+    """
+    Micro-batcher: coalesce concurrent NER requests into a single API call.
+    Waits up to NER_BATCH_MAX_LATENCY for up to NER_BATCH_MAX_SIZE texts, then
+    dispatches the batch without blocking collection of the next one
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = set()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + NER_BATCH_MAX_LATENCY
+        while len(batch) < NER_BATCH_MAX_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        task = asyncio.create_task(run_ner_batch(batch))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+def chunk_text_for_ner(text: str) -> List[str]:
+    """
+    Split text into chunks of at most NER_CHUNK_MAX_CHARS, breaking on line
+    boundaries where possible (and on spaces inside very long lines, with overlap)
+    """
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        while len(line) > NER_CHUNK_MAX_CHARS:
+            cut = line.rfind(" ", 0, NER_CHUNK_MAX_CHARS)
+            if cut <= 0:
+                cut = NER_CHUNK_MAX_CHARS
+            segments.append(line[:cut])
+            # Restart at the first word boundary within the overlap window (never
+            # before the middle of the piece, so every step makes progress)
+            start = line.find(" ", max(cut - NER_CHUNK_OVERLAP_CHARS, cut // 2), cut)
+            line = line[cut if start == -1 else start:].lstrip()
+        if line:
+            segments.append(line)
+    
+    # Pack consecutive lines into chunks
+    chunks = []
+    current = []
+    current_length = 0
+    for segment in segments:
+        if current and current_length + 1 + len(segment) > NER_CHUNK_MAX_CHARS:
+            chunks.append("\n".join(current))
+            current, current_length = [], 0
+        current.append(segment)
+        current_length += len(segment) + (1 if current_length else 0)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+async def extract_entities(text: str) -> list:
+    """Queue a text for batched NER and wait for its entities (cached per text)"""
+    cache_key = hashlib.sha256(text.encode()).digest()
+    entities = ttl_cache_get(NER_CACHE, cache_key)
+    if entities is not None:
+        return entities
+    
+    future = asyncio.get_running_loop().create_future()
+    await app.state.ner_queue.put((text, future))
+    entities = await future
+    ttl_cache_set(NER_CACHE, cache_key, entities, NER_CACHE_SIZE)
+    return entities
+
+def get_embeddings_batch(texts: List[str]) -> Optional[np.ndarray]:
+    """Get embeddings for several texts with a single Hugging Face API call"""
+    try:
+        result = call_hf_api(HF_API_URL_EMBEDDING, texts, "embedding")
         
         if isinstance(result, dict) and "error" in result:
             if "loading" in result["error"].lower():
                 raise HTTPException(status_code=503, detail="Model is loading, please try again in a few seconds")
             raise HTTPException(status_code=500, detail=f"API error: {result['error']}")
         
-        # API returns embeddings as a list
-        if isinstance(result, list):
-            # If it's a list of lists, return the first one
-            if len(result) > 0 and isinstance(result[0], list):
-                return result[0]
-            return result
+        # API returns one embedding (list of floats) per input text. float32 halves the
+        # size of the cached vectors and lets the similarity matmul run in single precision
+        embeddings = np.asarray(result, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(texts) or embeddings.shape[1] == 0:
+            raise ValueError(f"Unexpected embedding shape {embeddings.shape}")
         
-        return result
+        return embeddings
     except HTTPException as e:
-        # If API fails, return None to trigger fallback
-        if e.status_code in [410, 503, 500]:
+        # If API fails, return None to trigger fallback. 503 (model loading) is raised
+        # for run_inference to retry
+        if e.status_code in [410, 500]:
             return None
         raise
     except Exception as e:
@@ -152,24 +524,211 @@ def get_embeddings_with_api(text: str):
         print(f"⚠️  Embedding API error: {str(e)}, using fallback analysis")
         return None
 
-def extract_text_from_pdf(file_content: bytes) -> str:
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows are left as-is)"""
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.where(norms > 0, norms, 1.0)
+
+def get_cached_user_embedding(cache_key: bytes) -> Optional[np.ndarray]:
+    """Look up a user skills embedding in the LRU cache"""
+    with USER_EMBEDDING_CACHE_LOCK:
+        embedding = USER_EMBEDDING_CACHE.get(cache_key)
+        if embedding is not None:
+            USER_EMBEDDING_CACHE.move_to_end(cache_key)
+        return embedding
+
+def cache_user_embedding(cache_key: bytes, embedding: np.ndarray):
+    """Store a user skills embedding, evicting the least recently used entries"""
+    with USER_EMBEDDING_CACHE_LOCK:
+        USER_EMBEDDING_CACHE[cache_key] = embedding
+        USER_EMBEDDING_CACHE.move_to_end(cache_key)
+        while len(USER_EMBEDDING_CACHE) > USER_EMBEDDING_CACHE_SIZE:
+            USER_EMBEDDING_CACHE.popitem(last=False)
+
+def warm_category_embeddings():
+    """Fetch and cache embeddings for every category that is not cached yet"""
+    missing_categories = [c for c in SKILL_CATEGORIES if c not in CATEGORY_EMBEDDINGS]
+    if not missing_categories:
+        return
+    
+    embeddings = get_embeddings_batch([" ".join(SKILL_CATEGORIES[c]) for c in missing_categories])
+    if embeddings is None:
+        print("⚠️  Could not pre-fetch category embeddings, they will be fetched on first use")
+        return
+    
+    for category, embedding in zip(missing_categories, normalize_embeddings(embeddings)):
+        CATEGORY_EMBEDDINGS[category] = embedding
+
+async def warm_up_category_embeddings():
+    """Pre-fetch the category embeddings at startup, retrying while the model loads"""
+    try:
+        await run_inference(warm_category_embeddings)
+    except HTTPException:
+        print("⚠️  Could not pre-fetch category embeddings, they will be fetched on first use")
+
+def normalize_skills_text(skills: List[str]) -> str:
+    """
+    Canonical text for a skill list. The embedding model is uncased and skill order
+    carries no meaning, so skills are lowercased, deduplicated and sorted
+    """
+    return " ".join(sorted({s.strip().lower() for s in skills if s.strip()}))
+
+def get_skills_embedding(skills_text: str) -> Optional[np.ndarray]:
+    """
+    Get the normalized embedding for the user's (normalized) skills text. Repeated
+    skill sets are served from the cache, and categories that are not cached yet are
+    embedded in the same API call, so a request costs at most one round-trip
+    """
+    cache_key = hashlib.sha256(skills_text.encode()).digest()
+    user_embedding = get_cached_user_embedding(cache_key)
+    missing_categories = [c for c in SKILL_CATEGORIES if c not in CATEGORY_EMBEDDINGS]
+    if user_embedding is not None and not missing_categories:
+        return user_embedding
+    
+    texts = [" ".join(SKILL_CATEGORIES[c]) for c in missing_categories]
+    if user_embedding is None:
+        texts.insert(0, skills_text)
+    
+    try:
+        embeddings = get_embeddings_batch(texts)
+    except HTTPException:
+        # Model still loading: with a cached user embedding, don't hold it back for the categories
+        if user_embedding is None:
+            raise
+        embeddings = None
+    if embeddings is None:
+        # Missing categories fall back to keyword matching in the caller
+        return user_embedding
+    
+    embeddings = normalize_embeddings(embeddings)
+    if user_embedding is None:
+        user_embedding, embeddings = embeddings[0], embeddings[1:]
+        cache_user_embedding(cache_key, user_embedding)
+    for category, embedding in zip(missing_categories, embeddings):
+        CATEGORY_EMBEDDINGS[category] = embedding
+    return user_embedding
+
+async def fetch_skills_embedding(skills_text: str) -> Optional[np.ndarray]:
+    """get_skills_embedding on the inference pool (None if the model is still loading)"""
+    try:
+        return await run_inference(get_skills_embedding, skills_text)
+    except HTTPException as e:
+        if e.status_code == 503:
+            return None
+        raise
+
+async def get_skills_embedding_coalesced(skills: List[str]) -> Optional[np.ndarray]:
+    """
+    get_skills_embedding, but concurrent requests for the same skills share a single
+    in-flight lookup instead of each calling the API (request coalescing)
+    """
+    # During startup, wait for the category warm-up rather than fetching categories again
+    warmup = app.state.category_warmup
+    if not warmup.done() and len(CATEGORY_EMBEDDINGS) < len(SKILL_CATEGORIES):
+        try:
+            await asyncio.shield(warmup)
+        except Exception:
+            pass  # Missing categories are then fetched together with the user embedding
+    
+    skills_text = normalize_skills_text(skills)
+    future = EMBEDDINGS_IN_FLIGHT.get(skills_text)
+    if future is None:
+        future = asyncio.create_task(fetch_skills_embedding(skills_text))
+        EMBEDDINGS_IN_FLIGHT[skills_text] = future
+        future.add_done_callback(lambda _: EMBEDDINGS_IN_FLIGHT.pop(skills_text, None))
+    # Shielded so one cancelled request does not cancel the lookup for the others
+    return await asyncio.shield(future)
+
+def get_category_matrix() -> Tuple[List[str], Optional[np.ndarray]]:
+    """Get the cached category embeddings stacked into one (categories x dims) matrix"""
+    global CATEGORY_MATRIX
+    # The category cache only grows, so a size change means the matrix is stale
+    if CATEGORY_MATRIX is None or len(CATEGORY_MATRIX[0]) != len(CATEGORY_EMBEDDINGS):
+        categories = list(CATEGORY_EMBEDDINGS)
+        matrix = np.vstack([CATEGORY_EMBEDDINGS[c] for c in categories]) if categories else None
+        CATEGORY_MATRIX = (categories, matrix)
+    return CATEGORY_MATRIX
+
+def get_category_similarities(user_embedding: np.ndarray) -> Dict[str, float]:
+    """Cosine similarity of the user embedding to every embedded category, as one matmul"""
+    categories, matrix = get_category_matrix()
+    if matrix is None:
+        return {}
+    try:
+        # Rows and the user vector are unit length, so the product is the cosine similarity
+        similarities = matrix @ user_embedding
+    except ValueError:
+        # Dimension mismatch: use keyword matching for every category
+        return {}
+    return dict(zip(categories, similarities.tolist()))
+
+def ttl_cache_get(cache: "OrderedDict[Hashable, Tuple[float, Any]]", key: Hashable):
+    """Get a value from a TTL cache (None if missing or expired)"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        cache.pop(key, None)
+        return None
+    cache.move_to_end(key)
+    return value
+
+def ttl_cache_set(cache: "OrderedDict[Hashable, Tuple[float, Any]]", key: Hashable, value: Any, max_size: int):
+    """
+    Store a value in a TTL cache, dropping entries that have expired and then the
+    least recently used ones beyond max_size
+    """
+    now = time.monotonic()
+    for expired_key in [k for k, (expires_at, _) in cache.items() if expires_at < now]:
+        cache.pop(expired_key, None)
+    cache[key] = (now + CACHE_TTL_SECONDS, value)
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+def hash_and_check_size(file: BinaryIO) -> bytes:
+    """
+    Validate an uploaded file's size and return its BLAKE2b digest, reading it once in
+    chunks (the file is rewound afterwards). Rejects files larger than MAX_UPLOAD_SIZE
+    before any parsing happens; this is the backstop for uploads without a usable
+    Content-Length
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    for chunk in iter(lambda: file.read(1024 * 1024), b""):
+        size += len(chunk)
+        if size > MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)} MB."
+            )
+        digest.update(chunk)
+    file.seek(0)
+    return digest.digest()
+
+def extract_text_from_pdf(file: BinaryIO) -> str:
     """Extract text from PDF file"""
     try:
-        pdf_document = fitz.open(stream=file_content, filetype="pdf")
-        text = ""
-        for page in pdf_document:
-            text += page.get_text()
-        pdf_document.close()
-        return text
+        # PyMuPDF only opens in-memory documents from bytes, so read the upload once here
+        # The document is closed even if a page fails to parse
+        with fitz.open(stream=file.read(), filetype="pdf") as pdf_document:
+            # Join page texts once; repeated += copies the whole text for every page.
+            # Only the first MAX_PDF_PAGES pages are read
+            return "".join([
+                page.get_text("text", flags=PDF_TEXT_FLAGS, sort=False)
+                for page in pdf_document.pages(stop=MAX_PDF_PAGES)
+            ])
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading PDF: {str(e)}")
 
-def extract_text_from_docx(file_content: bytes) -> str:
+def extract_text_from_docx(file: BinaryIO) -> str:
     """Extract text from DOCX file"""
     try:
-        doc = Document(io.BytesIO(file_content))
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        return text
+        # python-docx reads straight from the (seekable) uploaded file object
+        doc = Document(file)
+        # Empty paragraphs only add blank lines, so they are skipped
+        return "\n".join([paragraph.text for paragraph in doc.paragraphs if paragraph.text])
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading DOCX: {str(e)}")
 
@@ -179,20 +738,28 @@ async def upload_resume(file: UploadFile = File(...)):
     Extract text from uploaded resume (PDF or DOCX)
     """
     try:
-        # Read file content
-        file_content = await file.read()
-        
         # Determine file type and extract text
+        # The parsers read the upload's spooled file directly instead of a full in-memory
+        # copy. Parsing is CPU-bound, so run it in a worker thread to keep the event loop free
+        loop = asyncio.get_running_loop()
         if file.filename.endswith('.pdf'):
-            text = extract_text_from_pdf(file_content)
+            extract_text = extract_text_from_pdf
         elif file.filename.endswith(('.doc', '.docx')):
-            text = extract_text_from_docx(file_content)
+            extract_text = extract_text_from_docx
         else:
             raise HTTPException(
                 status_code=400, 
                 detail="Unsupported file type. Please upload PDF or DOCX file."
             )
         
+        # Re-uploads of the same file are served from the text cache
+        content_hash = await loop.run_in_executor(app.state.executor, hash_and_check_size, file.file)
+        cache_key = (extract_text.__name__, content_hash)
+        text = ttl_cache_get(TEXT_CACHE, cache_key)
+        if text is None:
+            text = await loop.run_in_executor(app.state.executor, extract_text, file.file)
+            ttl_cache_set(TEXT_CACHE, cache_key, text, TEXT_CACHE_SIZE)
+        
         if not text.strip():
             raise HTTPException(status_code=400, detail="No text found in the document")
         
@@ -210,31 +777,12 @@ async def upload_resume(file: UploadFile = File(...)):
 
 def extract_skills_with_regex(text: str):
     """Fallback: Extract skills using regex patterns when API fails"""
-    skills = []
-    
-    # Comprehensive skill patterns
-    skill_patterns = [
-        # Programming Languages
-        r'\b(?:Python|Java|JavaScript|TypeScript|C\+\+|C#|Go|Rust|Swift|Kotlin|Scala|Ruby|PHP|Perl|R|MATLAB)\b',
-        # Frontend
-        r'\b(?:React|Vue|Angular|Next\.js|Nuxt\.js|Svelte|HTML|CSS|SCSS|SASS|Tailwind|Bootstrap|Material-UI|Redux|MobX)\b',
-        # Backend
-        r'\b(?:Node\.js|Express|Django|Flask|FastAPI|Spring|Spring Boot|Laravel|ASP\.NET|Rails|GraphQL|REST API)\b',
-        # Databases
-        r'\b(?:PostgreSQL|MySQL|MongoDB|Redis|Elasticsearch|Cassandra|DynamoDB|SQLite|Oracle|SQL Server|NoSQL|SQL)\b',
-        # Cloud & DevOps
-        r'\b(?:AWS|Azure|GCP|Google Cloud|Docker|Kubernetes|Terraform|Ansible|Jenkins|CI/CD|Git|GitHub|GitLab)\b',
-        # Data Science
-        r'\b(?:Machine Learning|ML|Deep Learning|AI|Data Science|NLP|Computer Vision|TensorFlow|PyTorch|Keras|Pandas|NumPy|Scikit-learn)\b',
-        # Tools
-        r'\b(?:Linux|Unix|Bash|Shell|Agile|Scrum|JIRA|Confluence|Microservices|System Design|API Design)\b',
-    ]
-    
-    for pattern in skill_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        skills.extend(matches)
+    # Deduplicate case-insensitively, keeping the first spelling found in the text
+    skills = {}
+    for match in SKILL_RE.findall(text):
+        skills.setdefault(match.lower(), match)
     
-    return list(set(skills))  # Remove duplicates
+    return list(skills.values())
 
 @app.post("/extract-skills")
 async def extract_skills(data: Dict[str, Any]):
@@ -250,7 +798,9 @@ async def extract_skills(data: Dict[str, Any]):
         # Try to extract entities using API
         entities = []
         try:
-            entities = extract_skills_with_api(text)
+            # Short chunks keep attention cost down; they are batched into one API call
+            chunk_entities = await asyncio.gather(*(extract_entities(chunk) for chunk in chunk_text_for_ner(text)))
+            entities = [entity for chunk in chunk_entities for entity in chunk]
         except HTTPException as e:
             # If API fails (410, etc.), use regex fallback
             if e.status_code in [410, 503, 500]:
@@ -269,21 +819,11 @@ async def extract_skills(data: Dict[str, Any]):
                 raise
         
         # Filter and categorize entities
-        skills = []
-        organizations = []
-        locations = []
-        persons = []
-        
-        # Common skill keywords to filter
-        skill_keywords = [
-            'python', 'java', 'javascript', 'react', 'node', 'aws', 'docker', 
-            'kubernetes', 'sql', 'mongodb', 'postgresql', 'git', 'linux', 
-            'agile', 'scrum', 'machine learning', 'ai', 'data science',
-            'typescript', 'angular', 'vue', 'django', 'flask', 'fastapi',
-            'html', 'css', 'tailwind', 'bootstrap', 'redux', 'graphql',
-            'rest api', 'microservices', 'ci/cd', 'jenkins', 'terraform',
-            'azure', 'gcp', 'redis', 'elasticsearch', 'kafka', 'spark'
-        ]
+        # Dicts deduplicate like sets but keep first-seen order, so responses are deterministic
+        skills: Dict[str, None] = {}
+        organizations: Dict[str, None] = {}
+        locations: Dict[str, None] = {}
+        persons: Dict[str, None] = {}
         
         for entity in entities:
             # Handle different API response formats
@@ -296,37 +836,25 @@ async def extract_skills(data: Dict[str, Any]):
             
             # Categorize entities
             if entity_type == 'ORG':
-                organizations.append(entity_word)
+                organizations.setdefault(entity_word, None)
             elif entity_type == 'LOC':
-                locations.append(entity_word)
+                locations.setdefault(entity_word, None)
             elif entity_type == 'PER':
-                persons.append(entity_word)
+                persons.setdefault(entity_word, None)
             
-            # Check if entity might be a skill
-            if any(keyword in entity_text for keyword in skill_keywords):
-                if entity_word not in skills:
-                    skills.append(entity_word)
-        
-        # Extract additional skills using regex patterns
-        skill_patterns = [
-            r'\b(?:Python|Java|JavaScript|TypeScript|React|Node\.js|Angular|Vue|Django|Flask|FastAPI)\b',
-            r'\b(?:AWS|Azure|GCP|Docker|Kubernetes|Terraform|Jenkins|Git)\b',
-            r'\b(?:SQL|MongoDB|PostgreSQL|Redis|Elasticsearch|Kafka)\b',
-            r'\b(?:Machine Learning|AI|Data Science|Deep Learning|NLP|Computer Vision)\b',
-        ]
+            # Check if entity might be a skill (any keyword occurs in the entity text)
+            if next(SKILL_KEYWORD_AUTOMATON.iter(entity_text), None) is not None:
+                skills.setdefault(entity_word, None)
         
-        for pattern in skill_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if match not in skills:
-                    skills.append(match)
+        # Add the regex-matched skills (the same single pass the fallback uses)
+        skills.update(dict.fromkeys(extract_skills_with_regex(text)))
         
         return JSONResponse({
             "success": True,
-            "skills": list(set(skills)),  # Remove duplicates
-            "organizations": list(set(organizations)),
-            "locations": list(set(locations)),
-            "persons": list(set(persons)),
+            "skills": list(skills),
+            "organizations": list(organizations),
+            "locations": list(locations),
+            "persons": list(persons),
             "total_entities": len(entities)
         })
     
@@ -335,35 +863,52 @@ async def extract_skills(data: Dict[str, Any]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting skills: {str(e)}")
 
-def analyze_skills_fallback(skills: List[str], skill_categories: Dict[str, List[str]]):
-    """Fallback skill analysis using keyword matching when API fails"""
+def keyword_category_score(category: str, user_skills_lower: FrozenSet[str]) -> float:
+    """Share of a category's skills that the user has (set intersection on lowercase names)"""
+    category_skills_lower = CATEGORY_SKILLS_LOWER[category]
+    if not category_skills_lower:
+        return 0.0
+    return len(category_skills_lower & user_skills_lower) / len(category_skills_lower)
+
+def keyword_covered_categories(skills: List[str]) -> Dict[str, float]:
+    """
+    Categories the user's skills already cover by keyword overlap, with that overlap
+    as their score. Their embedding similarity would add nothing, so it is skipped
+    """
+    user_skills_lower = frozenset(s.lower() for s in skills)
+    overlaps = {category: keyword_category_score(category, user_skills_lower) for category in SKILL_CATEGORIES}
+    return {category: overlap for category, overlap in overlaps.items() if overlap >= KEYWORD_COVERAGE_THRESHOLD}
+
+def score_categories(skills: List[str], similarities: Dict[str, float]):
+    """
+    Score every category and collect recommendations. Categories with an embedding
+    similarity use it; the rest fall back to keyword matching
+    """
     category_scores = {}
     recommended_skills = []
-    user_skills_lower = [s.lower() for s in skills]
+    user_skills_lower = frozenset(s.lower() for s in skills)
     
-    for category, category_skills in skill_categories.items():
-        # Count how many skills from this category the user has
-        matching_skills = [s for s in category_skills if s.lower() in user_skills_lower]
-        match_count = len(matching_skills)
-        total_in_category = len(category_skills)
-        
-        # Calculate score based on percentage of category skills matched
-        if total_in_category > 0:
-            score = match_count / total_in_category
+    for category, category_skills in SKILL_CATEGORIES.items():
+        similarity = similarities.get(category)
+        if similarity is not None:
+            score = similarity
+            recommend_below = 0.7  # If low similarity, recommend skills
         else:
-            score = 0.0
-        
+            score = keyword_category_score(category, user_skills_lower)
+            recommend_below = 0.5  # If user has less than 50% of category skills
         category_scores[category] = float(score)
         
         # Find missing skills in this category
         missing = [s for s in category_skills if s.lower() not in user_skills_lower]
-        
-        # Recommend skills if user has less than 50% of category skills
-        if missing and score < 0.5:
+        if missing and score < recommend_below:
             recommended_skills.extend(missing[:2])  # Top 2 from each category
     
     return category_scores, recommended_skills
 
+def analyze_skills_fallback(skills: List[str]):
+    """Fallback skill analysis using keyword matching when API fails"""
+    return score_categories(skills, {})
+
 @app.post("/analyze-skills")
 async def analyze_skills(data: Dict[str, Any]):
     """
@@ -375,108 +920,31 @@ async def analyze_skills(data: Dict[str, Any]):
         if not skills or len(skills) == 0:
             raise HTTPException(status_code=400, detail="Skills list is required")
         
-        # Common skill categories for analysis
-        skill_categories = {
-            "Programming Languages": ["Python", "Java", "JavaScript", "TypeScript", "C++", "Go", "Rust", "Swift", "Kotlin"],
-            "Frontend": ["React", "Vue", "Angular", "HTML", "CSS", "Tailwind CSS", "Next.js", "Redux"],
-            "Backend": ["Node.js", "Django", "Flask", "FastAPI", "Spring Boot", "Express.js", "REST API", "GraphQL"],
-            "Databases": ["PostgreSQL", "MongoDB", "MySQL", "Redis", "Elasticsearch", "SQL", "NoSQL"],
-            "Cloud & DevOps": ["AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "CI/CD", "Jenkins", "Git"],
-            "Data Science": ["Machine Learning", "Deep Learning", "Data Science", "AI", "NLP", "TensorFlow", "PyTorch", "Pandas"],
-            "Tools & Others": ["Git", "Linux", "Agile", "Scrum", "Microservices", "System Design"]
-        }
-        
-        # Try to get embeddings for user skills using API
-        user_skills_text = " ".join(skills)
-        user_embedding = get_embeddings_with_api(user_skills_text)
-        
-        # If API failed, use fallback method
-        if user_embedding is None:
-            print("⚠️  Embedding API unavailable, using keyword-based analysis")
-            category_scores, recommended_skills = analyze_skills_fallback(skills, skill_categories)
+        # Categories already well covered by keyword overlap are scored without embeddings
+        covered_scores = keyword_covered_categories(skills)
+        if len(covered_scores) == len(SKILL_CATEGORIES):
+            # Every category is covered, so the embedding API call can be skipped entirely
+            category_scores, recommended_skills = score_categories(skills, covered_scores)
         else:
-            # Use embedding-based analysis
-            # Ensure it's a list
-            if not isinstance(user_embedding, list):
-                user_embedding = [user_embedding]
-            
-            # Analyze which categories the user has skills in
-            category_scores = {}
-            recommended_skills = []
+            # Try to get embeddings for user skills using API
+            user_embedding = await get_skills_embedding_coalesced(skills)
             
-            import numpy as np
-            
-            for category, category_skills in skill_categories.items():
-                category_text = " ".join(category_skills)
-                category_embedding = get_embeddings_with_api(category_text)
-                
-                # If category embedding fails, use fallback for this category
-                if category_embedding is None:
-                    user_skills_lower = [s.lower() for s in skills]
-                    matching_skills = [s for s in category_skills if s.lower() in user_skills_lower]
-                    score = len(matching_skills) / len(category_skills) if category_skills else 0.0
-                    category_scores[category] = float(score)
-                    
-                    missing = [s for s in category_skills if s.lower() not in user_skills_lower]
-                    if missing and score < 0.5:
-                        recommended_skills.extend(missing[:2])
-                    continue
-                
-                # Ensure it's a list
-                if not isinstance(category_embedding, list):
-                    category_embedding = [category_embedding]
-                
-                # Validate embeddings are not None
-                if user_embedding is None or category_embedding is None:
-                    # Fallback for this category
-                    user_skills_lower = [s.lower() for s in skills]
-                    matching_skills = [s for s in category_skills if s.lower() in user_skills_lower]
-                    score = len(matching_skills) / len(category_skills) if category_skills else 0.0
-                    category_scores[category] = float(score)
-                    continue
-                
-                try:
-                    # Calculate cosine similarity
-                    user_emb = np.array(user_embedding)
-                    cat_emb = np.array(category_embedding)
-                    
-                    # Validate arrays are not empty
-                    if user_emb.size == 0 or cat_emb.size == 0:
-                        raise ValueError("Empty embedding array")
-                    
-                    # Normalize vectors
-                    user_norm = np.linalg.norm(user_emb)
-                    cat_norm = np.linalg.norm(cat_emb)
-                    
-                    if user_norm > 0 and cat_norm > 0:
-                        similarity = np.dot(user_emb, cat_emb) / (user_norm * cat_norm)
-                    else:
-                        similarity = 0.0
-                    
-                    category_scores[category] = float(similarity)
-                    
-                    # Find missing skills in this category
-                    user_skills_lower = [s.lower() for s in skills]
-                    missing = [s for s in category_skills if s.lower() not in user_skills_lower]
-                    
-                    if missing and similarity < 0.7:  # If low similarity, recommend skills
-                        recommended_skills.extend(missing[:2])  # Top 2 from each category
-                except (ValueError, TypeError) as e:
-                    # If numpy operations fail, use keyword matching for this category
-                    user_skills_lower = [s.lower() for s in skills]
-                    matching_skills = [s for s in category_skills if s.lower() in user_skills_lower]
-                    score = len(matching_skills) / len(category_skills) if category_skills else 0.0
-                    category_scores[category] = float(score)
-                    
-                    missing = [s for s in category_skills if s.lower() not in user_skills_lower]
-                    if missing and score < 0.5:
-                        recommended_skills.extend(missing[:2])
+            # If API failed, use fallback method
+            if user_embedding is None:
+                print("⚠️  Embedding API unavailable, using keyword-based analysis")
+                category_scores, recommended_skills = analyze_skills_fallback(skills)
+            else:
+                # Use embedding-based analysis for the remaining categories; categories
+                # without an embedding use keyword matching
+                similarities = get_category_similarities(user_embedding)
+                similarities.update(covered_scores)
+                category_scores, recommended_skills = score_categories(skills, similarities)
         
         # Get top 3 strongest categories
         top_categories = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)[:3]
         
         # Remove duplicates from recommendations
-        recommended_skills = list(set(recommended_skills))[:10]
+        recommended_skills = list(dict.fromkeys(recommended_skills))[:10]
         
         return JSONResponse({
             "success": True,
@@ -12,5 +12,10 @@ else
 fi
 
 # Start the FastAPI server
-python3 -m uvicorn main:app --reload --port 8000
-
+# Set WORKERS to run several worker processes (e.g. WORKERS=$(nproc) ./start.sh);
+# by default a single auto-reloading worker is started for development
+if [ -n "$WORKERS" ]; then
+    python3 -m uvicorn main:app --loop uvloop --http httptools --workers "$WORKERS" --port 8000
+else
+    python3 -m uvicorn main:app --loop uvloop --http httptools --reload --port 8000
+fi